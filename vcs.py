@@ -1,11 +1,119 @@
+import io
 import os
+import sys
 import re
 import cmd
+import shlex
+import shutil
+import argparse
 import json
+import mmap
 import time
+import zlib
+import struct
 import difflib
+import hashlib
+import functools
 import zipfile
 import datetime
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import readline
+except ImportError:
+    readline = None  # not available on Windows
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # not available on Windows
+
+try:
+    import deflate  # libdeflate bindings, ~2x faster than zlib at the same ratio
+except ImportError:
+    deflate = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from isal import isal_zlib  # AVX-accelerated DEFLATE
+except ImportError:
+    isal_zlib = None
+
+try:
+    from diff_match_patch import diff_match_patch  # C-backed Myers diff, much faster than difflib
+except ImportError:
+    diff_match_patch = None
+
+try:
+    import cydifflib  # compiled difflib with the same API
+except ImportError:
+    cydifflib = None
+
+
+def _write_stdout(lines):
+    """Write many output lines in one buffered write instead of one print per line"""
+    out = "\n".join(lines)
+    if out:
+        sys.stdout.write(out + "\n")
+
+
+def _json_loads(data):
+    """Parse metadata bytes, preferring the C-backed orjson when installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj):
+    """Serialize metadata to compact bytes in a single pass"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+
+def _streams_equal(a, b, chunk=65536):
+    """Compare two binary streams in fixed-size chunks, stopping at the first difference"""
+    while True:
+        block_a = a.read(chunk)
+        block_b = b.read(chunk)
+        if block_a != block_b:
+            return False
+        if not block_a:
+            return True
+
+
+def _hash_file(path, chunk=1 << 20):
+    """Content digest of a file, hashing an mmap'd view to avoid copying
+    the data through Python; falls back to chunked reads where mmap
+    is unavailable (empty or special files)"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                digest.update(mm)
+                return digest.hexdigest()
+        except (ValueError, OSError):
+            pass
+        while True:
+            block = f.read(chunk)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _atomic_write(path, data):
+    """Write bytes to a temporary file and rename it into place, so readers
+    never observe a partially written file"""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
 
 
 class VersionNumber:
@@ -20,10 +128,10 @@ class VersionNumber:
     @classmethod
     def parse(cls, version_str):
         """ Parses a version string in the form 'major.minor' and returns a VersionNumber instance"""
-        if not re.match(r'^\d+\.\d+$', version_str):
+        parts = version_str.split('.')
+        if len(parts) != 2 or not parts[0].isdigit() or not parts[1].isdigit():
             raise ValueError("Version number must be in the format 'major.minor' with integers")
-        major, minor = map(int, version_str.split('.'))
-        return cls(major, minor)
+        return cls(int(parts[0]), int(parts[1]))
 
     def auto_increment(self):
         """ Returns the next minor version number, keeping the major version constant"""
@@ -48,69 +156,184 @@ class VersionNumber:
                 )
 
 
+# Version strings repeat constantly across validation and log reads; parsed
+# instances are never mutated, so sharing them through a cache is safe
+_parse_version = functools.lru_cache(maxsize=4096)(VersionNumber.parse)
+
+
 class Repository:
-    def __init__(self, repo_dir, user):
+    # Write a full snapshot every SNAPSHOT_EVERY commits of a file so delta
+    # chains stay short to reconstruct
+    SNAPSHOT_EVERY = 10
+
+    def __init__(self, repo_dir, user, compress_level=None, delta_storage=False):
         self.user = user
+        if compress_level is None:
+            try:
+                compress_level = int(os.environ.get("VCS_COMPRESS_LEVEL", 9))
+            except ValueError:
+                print("Warning: ignoring non-integer VCS_COMPRESS_LEVEL")
+                compress_level = 9
+        self.compress_level = compress_level
+        self.delta_storage = delta_storage
         self.repo_dir = os.path.join(repo_dir, "_versions")
-        os.makedirs(self.repo_dir, exist_ok=True)
 
         self.current_branch = "main"
-        self.remote_repo = None  # Simulating a remote repository
+        self.remote_repo = None  # Directory acting as the remote repository
         self.locked = False  # Remote repository lock status
-        self.metadata_file = os.path.join(self.repo_dir, f"{self.current_branch}_metadata.json")
-
-        self.commit_log = CommitLog(self.metadata_file)
+        self._lock_fd = None  # open descriptor holding the remote flock
+        # One normalizing join up front; branch paths after that are plain formats
+        self._meta_path = os.path.join(self.repo_dir, "{}_metadata.json").format
+        self.metadata_file = self._meta_path(self.current_branch)
+
+        self._commit_logs = {}  # parsed CommitLog per branch, so switching back is free
+        self._branches = None  # branch names, seeded from one directory scan
+        self._branches_stamp = None  # repo_dir mtime_ns the seed was taken at
+        self._initialized = False
+
+    def init_repo(self):
+        """Create the repository storage directory; safe to call repeatedly"""
+        if not self._initialized:
+            os.makedirs(self.repo_dir, exist_ok=True)
+            self._initialized = True
+        return self
+
+    @property
+    def commit_log(self):
+        """The current branch's commit log, initializing the repository on first use"""
+        self.init_repo()
+        return self._get_commit_log(self.metadata_file)
+
+    def _get_commit_log(self, metadata_file):
+        """Return the cached CommitLog for a metadata file, re-parsing only
+        when the files changed on disk since they were loaded"""
+        cached = self._commit_logs.get(metadata_file)
+        if cached is not None and cached.is_current():
+            return cached
+        log = CommitLog(metadata_file)
+        self._commit_logs[metadata_file] = log
+        return log
 
     # --- commit and log methods ---
-    def commit_file(self, file_path):
+    def commit_file(self, file_path, auto=False):
         """Commit a file with a specific version"""
         if not os.path.exists(file_path):
             print(f"Error: File '{file_path}' does not exist")
             return
 
+        # Detect changes first: an unchanged file skips the version prompt,
+        # parsing and validation entirely
+        last_commit = self.commit_log.get_last_commit(file_path)
+        if last_commit:
+            last_version = last_commit["version"]
+            if not self.detect_file_changes(file_path, last_version):
+                print(f"No changes detected in '{file_path}', skipping commit")
+                return
+
         suggested_version = self.commit_log.get_next_version(file_path)
-        print(f"Commit {file_path} at version: {suggested_version}: press enter to continue, or type a new version number: ", end="")
-        user_input = input().strip() or str(suggested_version)
+        if auto:
+            user_input = str(suggested_version)
+        else:
+            print(f"Commit {file_path} at version: {suggested_version}: press enter to continue, or type a new version number: ", end="")
+            user_input = input().strip() or str(suggested_version)
 
         try:
-            version = str(VersionNumber.parse(user_input))
+            version = str(_parse_version(user_input))
             self.commit_log.validate_version(file_path, version)
         except ValueError as e:
             print(f"error {e}")
             return
 
-        # Detect changes before committing
-        last_commit = self.commit_log.get_last_commit(file_path)
-        if last_commit:
-            last_version = last_commit["version"]
-            if not self.detect_file_changes(file_path, last_version):
-                print(f"No changes detected in '{file_path}', skipping commit")
-                return
-
         # Create versioned file and add commit
+        with open(file_path, "rb") as f:
+            raw = f.read()
+        digest = hashlib.blake2b(raw, digest_size=16).hexdigest()
+
         versioned_file = FileVersion(file_path, version, self.repo_dir)
-        versioned_file.zip_file(file_path)
-        self.commit_log.add_commit(file_path, version, self.user)
+        earlier = self.commit_log.find_commit_by_digest(file_path, digest)
+        if earlier:
+            # Same content as an earlier version: link its blob, skip recompressing
+            versioned_file.link_to(FileVersion(file_path, earlier["version"], self.repo_dir))
+        else:
+            parent_bytes = self._delta_parent(file_path, last_commit)
+            if parent_bytes is not None:
+                versioned_file.write_delta(raw, last_commit["version"], parent_bytes,
+                                           level=self.compress_level)
+            else:
+                versioned_file.zip_file(file_path, level=self.compress_level, data=raw)
+        self.commit_log.add_commit(file_path, version, self.user, digest)
         print(f"Committed '{file_path}' as version {version}")
 
+    def commit_many(self, file_paths):
+        """Commit a batch of files non-interactively, compressing across processes"""
+        jobs = {}
+        for file_path in file_paths:
+            if not os.path.exists(file_path):
+                print(f"Error: File '{file_path}' does not exist")
+                continue
+            last_commit = self.commit_log.get_last_commit(file_path)
+            if last_commit and not self.detect_file_changes(file_path, last_commit["version"]):
+                print(f"No changes detected in '{file_path}', skipping commit")
+                continue
+            version = str(self.commit_log.get_next_version(file_path))
+            jobs[file_path] = (self.repo_dir, file_path, version, self.compress_level)
+
+        if not jobs:
+            return
+        self.init_repo()
+        with ProcessPoolExecutor() as executor:
+            for file_path, digest in executor.map(_commit_blob_worker, jobs.values()):
+                version = jobs[file_path][2]
+                # One coalesced save after the loop instead of one per file
+                self.commit_log.add_commit(file_path, version, self.user, digest,
+                                           flush=False)
+                print(f"Committed '{file_path}' as version {version}")
+        self.commit_log.save_metadata()
+        # The workers wrote the blobs, so their cache invalidation happened in
+        # the worker processes; drop this process's caches too
+        _clear_version_caches()
+
+    def _delta_parent(self, file_path, last_commit):
+        """Return the parent version's bytes when this commit should be stored as a delta"""
+        if not self.delta_storage or last_commit is None:
+            return None
+        if len(self.commit_log.get_commit_log(file_path)) % self.SNAPSHOT_EVERY == 0:
+            return None
+        try:
+            return FileVersion(file_path, last_commit["version"], self.repo_dir).read_bytes()
+        except (OSError, zlib.error):
+            return None
+
     def detect_file_changes(self, file_path, last_version):
         """Detects if the file has changed compared to its last committed version"""
         file_name = os.path.basename(file_path)
-        last_version_path = os.path.join(self.repo_dir, f"{file_name}_{last_version}.zip")
+        previous = FileVersion(file_path, last_version, self.repo_dir)
 
-        if not os.path.exists(last_version_path):
+        if not previous.exists():
             print(f"Warning: No previous version of '{file_name}' found")
             return True
 
         try:
+            current_size = os.path.getsize(file_path)
+            stored_size = previous.stored_size()
+            if stored_size is not None and stored_size != current_size:
+                return True
+            # With the commit's content digest on record, hashing the working
+            # file answers the question without decompressing the old version
+            last_commit = self.commit_log.get_last_commit(file_path)
+            if (last_commit and last_commit["version"] == last_version
+                    and "digest" in last_commit):
+                return _hash_file(file_path) != last_commit["digest"]
+            previous_data = previous.cached_bytes()
+            if len(previous_data) != current_size:
+                return True
             with open(file_path, "rb") as current_file:
-                current_data = current_file.read()
-
-            with zipfile.ZipFile(last_version_path, "r") as zip_file:
-                with zip_file.open(file_name, "r") as previous_file:
-                    previous_data = previous_file.read()
-
-            return current_data != previous_data
+                try:
+                    with mmap.mmap(current_file.fileno(), 0,
+                                   access=mmap.ACCESS_READ) as mm:
+                        return memoryview(mm) != previous_data
+                except (ValueError, OSError):
+                    return not _streams_equal(current_file, io.BytesIO(previous_data))
         except Exception as e:
             print(f"Error comparing versions of '{file_name}': {e}")
             return True
@@ -121,8 +344,10 @@ class Repository:
         if not log:
             print(f"No commits found for '{filename}'" if filename else "No commits in the repository")
         else:
-            for commit in log:
-                print(f"File: {commit['file']} | Version: {commit['version']} | User: {commit['user']} | Timestamp: {time.ctime(commit['timestamp'])}")
+            _write_stdout([
+                f"File: {commit['file']} | Version: {commit['version']} | User: {commit['user']} | Timestamp: {time.ctime(commit['timestamp'])}"
+                for commit in log
+            ])
 
     def list_files(self):
         """List all files in the repository"""
@@ -137,7 +362,6 @@ class Repository:
     def rollback_file(self, file_name, version):
         """Rollback a file to a specific version"""
         versioned_file = FileVersion(file_name, version, self.repo_dir)
-        print(file_name, version, self.repo_dir)
 
         if not versioned_file.restore_file(versioned_file):
             print(f"Error: Version '{version}' of file '{file_name}' not found")
@@ -156,39 +380,54 @@ class Repository:
         self.rollback_file(file_name, version)
 
     # --- branch management ---
+    def _branch_index(self):
+        """The set of branch names, rescanned only when the storage directory's
+        mtime moves (a branch created by another process); "main" always exists"""
+        try:
+            stamp = os.stat(self.repo_dir).st_mtime_ns
+        except FileNotFoundError:
+            stamp = None
+        if self._branches is None or stamp != self._branches_stamp:
+            self.init_repo()
+            suffix = "_metadata.json"
+            with os.scandir(self.repo_dir) as entries:
+                self._branches = {entry.name[:-len(suffix)]
+                                  for entry in entries
+                                  if entry.is_file() and entry.name.endswith(suffix)}
+            self._branches.add("main")
+            self._branches_stamp = os.stat(self.repo_dir).st_mtime_ns
+        return self._branches
+
     def create_branch(self, branch_name):
         """Create a new branch."""
-        branch_metadata_file = os.path.join(self.repo_dir, f"{branch_name}_metadata.json")
-        if os.path.exists(branch_metadata_file):
+        self.init_repo()
+        branch_metadata_file = self._meta_path(branch_name)
+        if branch_name in self._branch_index() or os.path.exists(branch_metadata_file):
             print(f"Branch '{branch_name}' already exists.")
             return
-        with open(branch_metadata_file, "w") as f:
-            json.dump({"files": {}, "commits": [], "tags": {}}, f)
+        _atomic_write(branch_metadata_file, _json_dumps({"files": {}, "tags": {}}))
+        self._branch_index().add(branch_name)
         print(f"Branch '{branch_name}' created.")
 
     def switch_branch(self, branch_name):
         """Switch to an existing branch."""
-        branch_metadata_file = os.path.join(self.repo_dir, f"{branch_name}_metadata.json")
-        if not os.path.exists(branch_metadata_file):
+        if branch_name not in self._branch_index():
             print(f"Branch '{branch_name}' does not exist.")
             return
         self.current_branch = branch_name
-        self.metadata_file = branch_metadata_file
-        self.commit_log = CommitLog(self.metadata_file)
+        self.metadata_file = self._meta_path(branch_name)
         print(f"Switched to branch '{branch_name}'.")
 
     def list_branches(self):
         """List all branches in the repository."""
-        branches = []
-        for file_name in os.listdir(self.repo_dir):
-            if file_name.endswith("_metadata.json"):
-                branches.append(file_name.replace("_metadata.json", ""))
+        branches = sorted(self._branch_index())
         if branches:
             print("Branches:")
             for branch in branches:
                 print(f"  - {branch}")
         else:
             print("No branches found.")
+        return branches
 
     def merge_branch(self, source_branch):
         """Merge the changes from a source branch into the current branch."""
@@ -196,36 +435,48 @@ class Repository:
             print("Error: Cannot merge a branch into itself.")
             return
 
-        source_metadata_file = os.path.join(self.repo_dir, f"{source_branch}_metadata.json")
+        source_metadata_file = self._meta_path(source_branch)
         if not os.path.exists(source_metadata_file):
             print(f"Error: Branch '{source_branch}' does not exist.")
             return
 
-        # Load metadata from the source branch
-        with open(source_metadata_file, "r") as f:
-            source_metadata = json.load(f)
+        # Load the source branch through the cached CommitLog so its
+        # append-only commit history is included
+        source_metadata = self._get_commit_log(source_metadata_file).metadata
 
         # Merge commits and tags into the current branch
         current_metadata = self.commit_log.metadata
         current_files = current_metadata["files"]
         source_files = source_metadata["files"]
 
-        # Merge files
-        for file_name, file_versions in source_files.items():
+        # Report conflicting files up front, diffing them across worker processes
+        # so a wide merge is not gated on one sequential diff per file
+        conflicts = [
+            (self.repo_dir, name, current_files[name], source_files[name])
+            for name in sorted(current_files.keys() & source_files.keys())
+            if isinstance(current_files[name], str) and isinstance(source_files[name], str)
+            and current_files[name] != source_files[name]
+        ]
+        if conflicts:
+            with ProcessPoolExecutor() as executor:
+                for name, diff_text in executor.map(_diff_worker, conflicts):
+                    print(f"Conflicting versions of '{name}':")
+                    print(diff_text)
+
+        # Merge files: adopt files the current branch does not track; on
+        # conflicting versions the current branch's version wins
+        for file_name, source_version in source_files.items():
             if file_name not in current_files:
-                current_files[file_name] = file_versions
-            else:
-                # Merge versions uniquely
-                existing_versions = {v["version"] for v in current_files[file_name]}
-                for version_entry in file_versions:
-                    if version_entry["version"] not in existing_versions:
-                        current_files[file_name].append(version_entry)
+                current_files[file_name] = source_version
 
         # Merge commits
         existing_commits = {(c["file"], c["version"]) for c in current_metadata["commits"]}
         for commit in source_metadata["commits"]:
-            if (commit["file"], commit["version"]) not in existing_commits:
+            key = (commit["file"], commit["version"])
+            if key not in existing_commits:
+                existing_commits.add(key)
                 current_metadata["commits"].append(commit)
+                self.commit_log._index_commit(commit)
 
         # Merge tags
         for tag_name, tag_data in source_metadata.get("tags", {}).items():
@@ -254,109 +505,580 @@ class Repository:
                 print(f"  - {tag}: File '{info['file']}' Version '{info['version']}'")
 
     # --- remote repository management ---
-    def push(self):
-        """Push changes to the remote repository"""
+    def set_remote(self, remote_dir):
+        """Configure the directory used as the remote repository"""
+        self.remote_repo = remote_dir
+        print(f"Remote repository set to '{remote_dir}'")
+
+    def push(self, remote_dir=None):
+        """Push changed version files and metadata to the remote directory"""
+        if remote_dir:
+            self.remote_repo = remote_dir
         if self.locked:
             print("Error: Remote repository is locked")
             return
         if self.remote_repo is None:
             print("Error: No remote repository configured")
             return
-        self.remote_repo.update(self.commit_log.metadata)
-        print(f"Changes pushed to remote repository for branch '{self.current_branch}'")
-
-    def pull(self):
-        """Pull changes from the remote repository"""
+        self.init_repo()
+        copied = _sync_dir(self.repo_dir, self.remote_repo)
+        print(f"Pushed {copied} changed file(s) to '{self.remote_repo}' for branch '{self.current_branch}'")
+
+    def pull(self, remote_dir=None):
+        """Pull changed version files and metadata from the remote directory"""
+        if remote_dir:
+            self.remote_repo = remote_dir
         if self.remote_repo is None:
             print("Error: No remote repository configured")
             return
-        remote_metadata = self.remote_repo.get_branch_metadata(self.current_branch)
-        self.commit_log.metadata = remote_metadata
-        self.commit_log.save_metadata()
-        print(f"Changes pulled from remote repository for branch '{self.current_branch}'")
+        self.init_repo()
+        copied = _sync_dir(self.remote_repo, self.repo_dir)
+        # Drop cached branch metadata and version content that the sync may
+        # have replaced on disk
+        self._commit_logs.clear()
+        self._branches = None
+        _clear_version_caches()
+        print(f"Pulled {copied} changed file(s) from '{self.remote_repo}' for branch '{self.current_branch}'")
 
     def lock_remote(self):
-        """Lock the remote repository to prevent updates"""
+        """Lock the remote repository to prevent updates.
+
+        With a remote configured this takes an OS-level flock on a lock file
+        there, so the kernel blocks other lockers and wakes them on release
+        instead of anyone polling; without one it is a local flag only."""
+        if self.locked:
+            print("Remote repository already locked")
+            return
+        if self.remote_repo is not None and fcntl is not None:
+            os.makedirs(self.remote_repo, exist_ok=True)
+            fd = os.open(os.path.join(self.remote_repo, ".lock"),
+                         os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            self._lock_fd = fd
         self.locked = True
         print("Remote repository locked")
 
     def unlock_remote(self):
         """Unlock the remote repository to allow updates"""
+        if self._lock_fd is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+            os.close(self._lock_fd)
+            self._lock_fd = None
         self.locked = False
         print("Remote repository unlocked")
 
 
+def _diff_lines(lines1, lines2, fromfile, tofile):
+    """Returns unified-diff style lines, using diff-match-patch when installed"""
+    if diff_match_patch is not None:
+        dmp = diff_match_patch()
+        dmp.Diff_Timeout = 1.0
+        # The trailing newline keeps a file's last line hashing like the same
+        # line mid-file, so end-of-file edits (e.g. appends) diff minimally
+        text1 = "\n".join(lines1) + "\n" if lines1 else ""
+        text2 = "\n".join(lines2) + "\n" if lines2 else ""
+        chars1, chars2, line_array = dmp.diff_linesToChars(text1, text2)
+        diffs = dmp.diff_main(chars1, chars2, False)
+        dmp.diff_charsToLines(diffs, line_array)
+        return _render_unified(diffs, fromfile, tofile)
+    engine = cydifflib if cydifflib is not None else difflib
+    return list(engine.unified_diff(lines1, lines2, fromfile=fromfile, tofile=tofile))
+
+
+def _format_range(start, length):
+    """Format one side of a hunk header the way unified_diff does"""
+    if length == 1:
+        return str(start + 1)
+    if length == 0:
+        return f"{start},0"
+    return f"{start + 1},{length}"
+
+
+def _render_unified(diffs, fromfile, tofile, context=3):
+    """Render diff-match-patch line-mode diffs as a unified diff with hunk headers.
+
+    Each segment is split on newlines keeping genuine blank lines; only the
+    empty trailing piece of a segment that ends in a newline is dropped."""
+    ops = []
+    for op, text in diffs:
+        parts = text.split("\n")
+        if text.endswith("\n"):
+            parts.pop()
+        ops.extend((op, part) for part in parts)
+
+    changed = [index for index, (op, _) in enumerate(ops) if op != 0]
+    if not changed:
+        return []
+
+    # Per-op-index line numbers on each side, for the @@ headers
+    line1_at, line2_at = [], []
+    line1 = line2 = 0
+    for op, _ in ops:
+        line1_at.append(line1)
+        line2_at.append(line2)
+        line1 += op != 1
+        line2 += op != -1
+
+    # Changed runs separated by more than 2 * context equal lines get their
+    # own hunk; a gap of exactly 2 * context stays merged, as unified_diff does
+    groups = [[changed[0]]]
+    for index in changed[1:]:
+        if index - groups[-1][-1] > 2 * context + 1:
+            groups.append([])
+        groups[-1].append(index)
+
+    output = [f"--- {fromfile}", f"+++ {tofile}"]
+    markers = {0: " ", 1: "+", -1: "-"}
+    for group in groups:
+        lo = max(0, group[0] - context)
+        hi = min(len(ops), group[-1] + context + 1)
+        hunk = ops[lo:hi]
+        length1 = sum(op != 1 for op, _ in hunk)
+        length2 = sum(op != -1 for op, _ in hunk)
+        output.append(f"@@ -{_format_range(line1_at[lo], length1)} "
+                      f"+{_format_range(line2_at[lo], length2)} @@")
+        output.extend(markers[op] + line for op, line in hunk)
+    return output
+
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)((?:,\d+)?) \+(\d+)((?:,\d+)?) @@")
+
+
+def _opcode_counts(hashes1, hashes2):
+    """Addition and deletion counts from SequenceMatcher opcodes over hashed lines.
+
+    Comparing 64-bit line hashes keeps the matcher's inner loop on ints and
+    matches unified_diff's +/- counts, including when lines are reordered."""
+    prefix, suffix = _common_affixes(hashes1, hashes2, context=0)
+    engine = cydifflib if cydifflib is not None else difflib
+    matcher = engine.SequenceMatcher(None,
+                                      hashes1[prefix:len(hashes1) - suffix],
+                                      hashes2[prefix:len(hashes2) - suffix],
+                                      autojunk=True)
+    additions = deletions = 0
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag in ("insert", "replace"):
+            additions += j2 - j1
+        if tag in ("delete", "replace"):
+            deletions += i2 - i1
+    return additions, deletions
+
+
+def _line_hashes(data):
+    """64-bit per-line hashes of raw content, used for fast equality scans"""
+    return array("Q", (int.from_bytes(hashlib.blake2b(line, digest_size=8).digest(), "little")
+                       for line in data.splitlines()))
+
+
+def _common_affixes(hashes1, hashes2, context=3):
+    """Length of the shared line prefix and suffix of two hash arrays.
+
+    Leaves `context` matching lines on each side so a unified diff of the
+    trimmed middle still carries its surrounding context lines."""
+    limit = min(len(hashes1), len(hashes2))
+    prefix = 0
+    while prefix < limit and hashes1[prefix] == hashes2[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and hashes1[-1 - suffix] == hashes2[-1 - suffix]:
+        suffix += 1
+    return max(0, prefix - context), max(0, suffix - context)
+
+
+def _offset_hunk(line, offset):
+    """Shift a unified-diff hunk header by a trimmed line prefix"""
+    match = _HUNK_HEADER.match(line)
+    if not match:
+        return line
+    return (f"@@ -{int(match.group(1)) + offset}{match.group(2)} "
+            f"+{int(match.group(3)) + offset}{match.group(4)} @@")
+
+
+@functools.lru_cache(maxsize=16)
+def _load_version_bytes(versions_dir, file_name, version):
+    """Cached content of a stored version, shared by diff, metrics and change detection"""
+    return FileVersion(file_name, version, versions_dir).read_bytes()
+
+
+@functools.lru_cache(maxsize=32)
+def _read_version_lines(versions_dir, file_name, version):
+    """Cached decoded line tuple of a stored version, so repeated diff and
+    metrics calls in one session skip the decode and split as well"""
+    return tuple(_load_version_bytes(versions_dir, file_name, version).decode("utf-8").splitlines())
+
+
+def _clear_version_caches():
+    """Drop cached version content after any write to the version store"""
+    _load_version_bytes.cache_clear()
+    _read_version_lines.cache_clear()
+
+
+def _commit_blob_worker(job):
+    """Compress and store one version blob; module-level so it pickles into worker processes"""
+    versions_dir, file_path, version, level = job
+    with open(file_path, "rb") as f:
+        data = f.read()
+    FileVersion(file_path, version, versions_dir).zip_file(file_path, level=level, data=data)
+    return file_path, hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _diff_worker(job):
+    """Diff two stored versions of a file; module-level so it pickles into worker processes"""
+    versions_dir, file_name, version1, version2 = job
+    try:
+        lines1 = FileVersion(file_name, version1, versions_dir).text_lines()
+        lines2 = FileVersion(file_name, version2, versions_dir).text_lines()
+        diff = _diff_lines(lines1, lines2,
+                           fromfile=f"{file_name}_{version1}",
+                           tofile=f"{file_name}_{version2}")
+        return file_name, "\n".join(diff)
+    except Exception as e:
+        return file_name, f"Could not diff '{file_name}': {e}"
+
+
+def _append_ndjson_tail(src_path, dst_path, src_size):
+    """Append only the new tail of an append-only log to an older copy.
+
+    The copy's length is the resume offset; a short probe of the bytes just
+    before it guards against diverged histories. Returns False when the tail
+    cannot be appended and the caller should fall back to a full copy."""
+    try:
+        dst_size = os.path.getsize(dst_path)
+    except FileNotFoundError:
+        return False
+    if dst_size == 0 or dst_size >= src_size:
+        return False
+    probe_len = min(dst_size, 256)
+    with open(src_path, "rb") as src, open(dst_path, "r+b") as dst:
+        dst.seek(dst_size - probe_len)
+        probe = dst.read(probe_len)
+        src.seek(dst_size - probe_len)
+        if src.read(probe_len) != probe:
+            return False
+        shutil.copyfileobj(src, dst, length=1 << 17)
+    return True
+
+
+def _sync_dir(src, dst):
+    """Copy changed files from src to dst, skipping entries whose size and mtime match.
+
+    shutil.copyfile performs the copy in kernel space (sendfile/copy_file_range)
+    on platforms that support it, so unchanged files cost one stat and changed
+    files avoid shuffling bytes through Python."""
+    os.makedirs(dst, exist_ok=True)
+    copied = 0
+    with os.scandir(src) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            target = os.path.join(dst, entry.name)
+            stat = entry.stat()
+            try:
+                target_stat = os.stat(target)
+                if target_stat.st_size == stat.st_size and target_stat.st_mtime_ns == stat.st_mtime_ns:
+                    continue
+            except FileNotFoundError:
+                pass
+            if not (entry.name.endswith("_commits.ndjson")
+                    and _append_ndjson_tail(entry.path, target, stat.st_size)):
+                shutil.copyfile(entry.path, target)
+            shutil.copystat(entry.path, target)
+            copied += 1
+    return copied
+
+
+def _looks_compressed(data):
+    """Returns True when a 64 KiB sample looks high-entropy (already compressed)"""
+    sample = data[:65536]
+    if not sample:
+        return False
+    return len(set(sample)) / 256 > 0.9
+
+
+# File types that are already compressed; deflating them burns CPU to grow them
+_STORED_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif", ".zip", ".gz",
+                    ".bz2", ".xz", ".7z", ".mp3", ".mp4", ".webp")
+
+
+def _pick_level(data, default=9, file_name=""):
+    """Choose a DEFLATE level for the data, 0 meaning store uncompressed.
+
+    A known-compressed suffix decides without looking at the data; otherwise
+    tiny inputs are not worth a DEFLATE stream (the header outweighs the
+    saving) and high-entropy input is already compressed."""
+    if file_name.lower().endswith(_STORED_SUFFIXES):
+        return 0
+    if len(data) < 256 or _looks_compressed(data):
+        return 0
+    return default
+
+
+def _deflate_raw(data, level):
+    """Compresses bytes to a raw DEFLATE stream, preferring the fastest installed backend"""
+    if deflate is not None:
+        return deflate.deflate_compress(data, level)
+    if isal_zlib is not None:
+        compressor = isal_zlib.compressobj(min(level, 3), isal_zlib.DEFLATED, -15)
+        return compressor.compress(data) + compressor.flush()
+    # Plain zlib pays heavily for its top levels; cap at 6 so a no-extras
+    # install keeps commit latency over the last few percent of ratio
+    compressor = zlib.compressobj(min(level, 6), zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _write_zip_member(zip_path, file_name, data, level):
+    """Writes a single-member zip archive, hand-building the headers to avoid
+    zipfile's per-entry overhead; stores high-entropy data uncompressed"""
+    crc = zlib.crc32(data)
+    level = _pick_level(data, level, file_name)
+    if level == 0:
+        method, payload = zipfile.ZIP_STORED, data
+    else:
+        method, payload = zipfile.ZIP_DEFLATED, _deflate_raw(data, level)
+    name = file_name.encode("utf-8")
+    now = time.localtime()
+    dos_time = (now.tm_hour << 11) | (now.tm_min << 5) | (now.tm_sec // 2)
+    dos_date = ((now.tm_year - 1980) << 9) | (now.tm_mon << 5) | now.tm_mday
+    local_header = struct.pack(
+        "<IHHHHHIIIHH", 0x04034B50, 20, 0, method, dos_time, dos_date,
+        crc, len(payload), len(data), len(name), 0,
+    )
+    central_offset = len(local_header) + len(name) + len(payload)
+    central_header = struct.pack(
+        "<IHHHHHHIIIHHHHHII", 0x02014B50, 20, 20, 0, method, dos_time, dos_date,
+        crc, len(payload), len(data), len(name), 0, 0, 0, 0, 0, 0,
+    )
+    end_record = struct.pack(
+        "<IHHHHIIH", 0x06054B50, 0, 0, 1, 1,
+        len(central_header) + len(name), central_offset, 0,
+    )
+    with open(zip_path, "wb") as f:
+        f.write(local_header + name + payload + central_header + name + end_record)
+
+
+def _read_zip_member(zip_path):
+    """Reads the single member of a version archive by parsing its local file
+    header directly: one read and one raw inflate, no central-directory walk"""
+    with open(zip_path, "rb") as f:
+        blob = f.read()
+    (signature, _, flags, method, _, _, crc, payload_size, _,
+     name_len, extra_len) = struct.unpack_from("<IHHHHHIIIHH", blob)
+    if signature != 0x04034B50 or flags & 0x08:
+        # Not a plain local header (or sizes deferred to a data descriptor):
+        # fall back to the full zipfile machinery
+        with zipfile.ZipFile(zip_path, "r") as zipf:
+            return zipf.read(zipf.namelist()[0])
+    start = 30 + name_len + extra_len
+    payload = blob[start:start + payload_size]
+    if method == zipfile.ZIP_DEFLATED:
+        decompressor = zlib.decompressobj(-15)
+        payload = decompressor.decompress(payload) + decompressor.flush()
+    if zlib.crc32(payload) != crc:
+        raise zlib.error(f"CRC mismatch reading '{zip_path}'")
+    return payload
+
+
 class FileVersion:
     def __init__(self, file_name, version, versions_dir):
         self.file_name = file_name
         self.version = version
         self.versions_dir = versions_dir
-        self.zip_name = os.path.join(versions_dir, f"{file_name}_{version}.zip")
-    
+        # One normalizing join; the per-format names are plain concatenations
+        prefix = os.path.join(versions_dir, f"{file_name}_{version}")
+        self.zip_name = prefix + ".zip"
+        self.delta_name = prefix + ".delta"
+        self.idx_name = prefix + ".idx"
+        self._diff_cache = {}  # rendered hunk lines per other version's zip name
+
     def __str__(self):
         """Returns the version as a string in 'major.minor' format"""
         return f"{self.zip_name}"
 
-    def zip_file(self, file_path):
+    def zip_file(self, file_path, level=9, data=None):
         """Zips a file and stores it as a version"""
-        with zipfile.ZipFile(self.zip_name, 'w') as zipf:
-            zipf.write(file_path, arcname=self.file_name)
+        if data is None:
+            with open(file_path, "rb") as f:
+                data = f.read()
+        _write_zip_member(self.zip_name, self.file_name, data, level)
+        self._write_line_index(data)
+        _clear_version_caches()
+
+    def write_delta(self, data, parent_version, parent_bytes, level=9):
+        """Store this version compressed against its parent's bytes as a preset dictionary"""
+        compressor = zlib.compressobj(min(level, 9), zlib.DEFLATED, zlib.MAX_WBITS,
+                                      zlib.DEF_MEM_LEVEL, zlib.Z_DEFAULT_STRATEGY,
+                                      parent_bytes)
+        payload = compressor.compress(data) + compressor.flush()
+        parent_tag = parent_version.encode("utf-8")
+        with open(self.delta_name, "wb") as f:
+            f.write(b"VCSD" + bytes([len(parent_tag)]) + parent_tag + payload)
+        self._write_line_index(data)
+        _clear_version_caches()
+
+    def read_bytes(self):
+        """Return the full content of this version, walking delta parents if needed"""
+        try:
+            return _read_zip_member(self.zip_name)
+        except FileNotFoundError:
+            pass
+        with open(self.delta_name, "rb") as f:
+            blob = f.read()
+        if blob[:4] != b"VCSD":
+            raise zlib.error(f"Unrecognised delta file '{self.delta_name}'")
+        tag_len = blob[4]
+        parent_version = blob[5:5 + tag_len].decode("utf-8")
+        parent = FileVersion(self.file_name, parent_version, self.versions_dir)
+        decompressor = zlib.decompressobj(zdict=parent.read_bytes())
+        return decompressor.decompress(blob[5 + tag_len:]) + decompressor.flush()
+
+    def exists(self):
+        """Check whether this version is stored, as a zip or a delta"""
+        return os.path.exists(self.zip_name) or os.path.exists(self.delta_name)
+
+    def stored_size(self):
+        """The uncompressed size recorded in the archive's local header,
+        or None when it is unavailable (delta storage, foreign archives)"""
+        try:
+            with open(self.zip_name, "rb") as f:
+                header = f.read(30)
+            (signature, _, flags, _, _, _, _, _, size,
+             _, _) = struct.unpack("<IHHHHHIIIHH", header)
+        except (FileNotFoundError, struct.error):
+            return None
+        if signature != 0x04034B50 or flags & 0x08:
+            return None
+        return size
+
+    def _write_line_index(self, data):
+        """Store the per-line hash sidecar used to trim unchanged diff regions"""
+        with open(self.idx_name, "wb") as f:
+            f.write(_line_hashes(data).tobytes())
+
+    def _line_hash_index(self):
+        """Per-line 64-bit hashes, read from the sidecar or computed on demand"""
+        try:
+            with open(self.idx_name, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return _line_hashes(self.cached_bytes())
+        hashes = array("Q")
+        hashes.frombytes(raw)
+        return hashes
+
+    def cached_bytes(self):
+        """This version's content via the shared LRU cache, so back-to-back
+        diff/metrics/change-detection calls decompress each version once"""
+        return _load_version_bytes(self.versions_dir, self.file_name, self.version)
+
+    def text_lines(self):
+        """Return this version's decoded lines from the shared cache"""
+        return _read_version_lines(self.versions_dir, self.file_name, self.version)
+
+    def byte_lines(self):
+        """Return this version's raw lines without trailing newlines"""
+        return self.cached_bytes().splitlines()
+
+    def link_to(self, other_version):
+        """Reuse another version's archive for identical content via a hard link"""
+        if os.path.exists(other_version.zip_name):
+            source, target = other_version.zip_name, self.zip_name
+        else:
+            source, target = other_version.delta_name, self.delta_name
+        if os.path.exists(target):
+            os.remove(target)
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copyfile(source, target)
+        if os.path.exists(other_version.idx_name):
+            try:
+                os.link(other_version.idx_name, self.idx_name)
+            except OSError:
+                shutil.copyfile(other_version.idx_name, self.idx_name)
+        _clear_version_caches()
     
     def unzip_file(self, output_dir="."):
-        """Unzips the versioned file to the current directory"""
-        with zipfile.ZipFile(self.zip_name, 'r') as zipf:
-            zipf.extract(self.file_name, output_dir)
+        """Restores the versioned file under the output directory in one buffered write"""
+        target = os.path.join(output_dir, self.file_name)
+        parent = os.path.dirname(target)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(self.read_bytes())
 
     def list_versions(self):
-        """List all saved versions of the file from zip archives"""
-        versions = [f for f in os.listdir(self.versions_dir) if f.endswith(".zip")]
+        """List the stored versions of this file, archives and deltas alike"""
+        prefix = f"{self.file_name}_"
+        versions = []
+        with os.scandir(self.versions_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                if (entry.is_file() and name.startswith(prefix)
+                        and name.endswith((".zip", ".delta"))):
+                    token = name[len(prefix):name.rfind(".")]
+                    try:
+                        # Guards against other files whose names share this prefix,
+                        # e.g. app_notes_1.0.zip when listing versions of app
+                        _parse_version(token)
+                    except ValueError:
+                        continue
+                    versions.append(token)
+        versions.sort(key=lambda v: tuple(int(p) for p in v.split(".")))
         if not versions:
-            print(f"No versions found for file '{self.file_path}'")
+            print(f"No versions found for file '{self.file_name}'")
         else:
-            print(f"Versions for file '{self.file_path}':")
+            print(f"Versions for file '{self.file_name}':")
             for version in versions:
-                print(f"  - {os.path.splitext(version)[0]}")
-        return [os.path.splitext(v)[0] for v in versions]
+                print(f"  - {version}")
+        return versions
 
     def restore_file(self, version_name):
-        """Restore a specific version of the file from a zip archive"""
-        version_file = version_name.zip_name
-        if not os.path.exists(version_file):
+        """Restore a specific version of the file from its stored archive or delta"""
+        if not version_name.exists():
             print(f"Error: Version '{version_name}' does not exist for file '{self.file_name}'")
             return False
-        with zipfile.ZipFile(version_file, "r") as zf:
-            zf.extract(os.path.basename(self.file_name), os.path.dirname(self.file_name))
-        # print(f"File '{self.file_name}' restored to version '{version_name}'")
+        target = os.path.join(os.path.dirname(self.file_name) or ".",
+                              os.path.basename(self.file_name))
+        with open(target, "wb") as f:
+            f.write(version_name.read_bytes())
         return True
 
+    def _compute_diff(self, other_version):
+        """Render the diff against another version once, tallying counts as it goes"""
+        cached = self._diff_cache.get(other_version.zip_name)
+        if cached is not None:
+            return cached
+
+        # Trim the shared prefix and suffix (found by comparing line hashes)
+        # before decoding anything, so only the changed middle of each file
+        # is ever materialised as strings for the diff engine
+        prefix, suffix = _common_affixes(self._line_hash_index(),
+                                         other_version._line_hash_index())
+        lines1 = self.byte_lines()
+        lines2 = other_version.byte_lines()
+        file1_content = [line.decode("utf-8", "replace")
+                         for line in lines1[prefix:len(lines1) - suffix]]
+        file2_content = [line.decode("utf-8", "replace")
+                         for line in lines2[prefix:len(lines2) - suffix]]
+        diff = _diff_lines(file1_content, file2_content,
+                           fromfile=f"{self.file_name}_{self.version}",
+                           tofile=f"{other_version.file_name}_{other_version.version}")
+
+        hunks = [_offset_hunk(line, prefix) if prefix else line for line in diff]
+        self._diff_cache[other_version.zip_name] = hunks
+        return hunks
+
     def show_diff(self, other_version):
         """Displays the differences between this version and another version"""
-        with zipfile.ZipFile(self.zip_name, 'r') as zipf1, \
-             zipfile.ZipFile(other_version.zip_name, 'r') as zipf2:
-            file1_content = zipf1.read(self.file_name).decode('utf-8').splitlines()
-            file2_content = zipf2.read(other_version.file_name).decode('utf-8').splitlines()
-        
-        diff = difflib.unified_diff(file1_content, file2_content, 
-                                    fromfile=f"{self.file_name}_{self.version}",
-                                    tofile=f"{other_version.file_name}_{other_version.version}")
-
-        for line in diff:
-            print(line)
+        _write_stdout(self._compute_diff(other_version))
 
     def calculate_metrics(self, other_version):
-        """Displays the differences between this version and another version"""
-        with zipfile.ZipFile(self.zip_name, 'r') as zipf1, \
-             zipfile.ZipFile(other_version.zip_name, 'r') as zipf2:
-            
-            file1_content = zipf1.read(self.file_name).decode('utf-8').splitlines()
-            file2_content = zipf2.read(other_version.file_name).decode('utf-8').splitlines()
-        
-        diff = difflib.unified_diff(file1_content, file2_content, 
-                                    fromfile=f"{self.file_name}_{self.version}",
-                                    tofile=f"{other_version.file_name}_{other_version.version}")
-        
-        additions = sum(1 for line in diff if line.startswith('+') and not line.startswith('+++'))
-        deletions = sum(1 for line in diff if line.startswith('-') and not line.startswith('---'))
+        """Displays the addition and deletion counts between this version and another version"""
+        # Always count from the hashed lines rather than a cached rendered
+        # diff, so the numbers do not depend on which diff engine rendered
+        # it or on whether a diff was displayed first
+        additions, deletions = _opcode_counts(self._line_hash_index(),
+                                              other_version._line_hash_index())
 
         print(f"Changes between {self.file_name} {self.version} and {other_version.version}:")
         print(f"  Additions: {additions}")
@@ -366,47 +1088,136 @@ class FileVersion:
 class CommitLog:
     def __init__(self, metadata_file):
         self.metadata_file = metadata_file
+        self.commits_file = metadata_file.replace("_metadata.json", "_commits.ndjson")
         self.metadata = self._load_metadata()
+        self._loaded_stamp = self._disk_stamp()
+        self._state_bytes = None  # serialized state as last written
+        # In-memory lookup indexes, built in one pass and maintained as
+        # commits are added, so per-file queries stop scanning the history
+        self._by_file = {}
+        self._by_digest = {}
+        for commit in self.metadata["commits"]:
+            self._index_commit(commit)
+        if self._log_dirty:
+            self.compact()
+
+    def compact(self):
+        """Rewrite the commit log as one clean file from the in-memory entries.
+
+        The log only accumulates junk through crashes mid-append or hand
+        edits, so this runs when loading skipped a malformed line rather
+        than on a schedule."""
+        commits = self.metadata["commits"]
+        _atomic_write(self.commits_file,
+                      b"".join(_json_dumps(c) + b"\n" for c in commits))
+        self._commits_on_disk = len(commits)
+        self.save_metadata()
+
+    def _index_commit(self, commit):
+        """Register a commit entry in the per-file and per-digest indexes.
+
+        The first commit of a digest stays canonical, as the old linear
+        scan returned."""
+        self._by_file.setdefault(commit["file"], []).append(commit)
+        if "digest" in commit:
+            self._by_digest.setdefault((commit["file"], commit["digest"]), commit)
+
+    def _disk_stamp(self):
+        """Fingerprint of the on-disk state and commit-log files"""
+        def mtime(path):
+            try:
+                return os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                return None
+        return (mtime(self.metadata_file), mtime(self.commits_file))
+
+    def is_current(self):
+        """Whether the in-memory metadata still matches the files on disk"""
+        return self._disk_stamp() == self._loaded_stamp
 
     def _load_metadata(self):
-        """Load metadata from the file, initializing if missing or corrupted"""
+        """Load branch state and the append-only commit log, initializing if missing or corrupted"""
         try:
-            if os.path.exists(self.metadata_file):
-                with open(self.metadata_file, "r") as f:
-                    return json.load(f)
-            return {"files": {}, "commits": [], "tags": {}}
-        except json.JSONDecodeError:
+            with open(self.metadata_file, "rb") as f:
+                metadata = _json_loads(f.read())
+        except FileNotFoundError:
+            metadata = {"files": {}, "tags": {}}
+        except ValueError:
             print(f"Warning: Metadata file '{self.metadata_file}' is corrupted. Initializing a new metadata structure")
-            return {"files": {}, "commits": [], "tags": {}}
+            metadata = {"files": {}, "tags": {}}
 
-    def save_metadata(self):
-        """Save the metadata back to the file"""
-        with open(self.metadata_file, "w") as f:
-            json.dump(self.metadata, f, indent=4)
+        # Older metadata files carried the commit list inline; keep those
+        # entries after the persisted log so the next save appends them to it
+        legacy_commits = metadata.pop("commits", [])
+        commits = []
+        self._log_dirty = False
+        try:
+            with open(self.commits_file, "rb") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        commits.append(_json_loads(line))
+                    except ValueError:
+                        # A line truncated by a crash mid-append; drop it and
+                        # rewrite the log below so offsets stay trustworthy
+                        self._log_dirty = True
+        except FileNotFoundError:
+            pass
+        self._commits_on_disk = len(commits)
+        commits.extend(legacy_commits)
+        metadata.setdefault("files", {})
+        metadata.setdefault("tags", {})
+        metadata["commits"] = commits
+        return metadata
 
-    def add_commit(self, file_name, version, user):
-        """Add a new commit entry"""
+    def save_metadata(self):
+        """Persist the small state file and append any new commits to the log.
+
+        Commit history is append-only, so a commit costs one appended line
+        instead of rewriting the whole metadata file."""
+        state = _json_dumps({"files": self.metadata["files"], "tags": self.metadata["tags"]})
+        if state != self._state_bytes:
+            _atomic_write(self.metadata_file, state)
+            self._state_bytes = state
+        commits = self.metadata["commits"]
+        if len(commits) > self._commits_on_disk:
+            with open(self.commits_file, "ab") as f:
+                f.write(b"".join(_json_dumps(c) + b"\n" for c in commits[self._commits_on_disk:]))
+            self._commits_on_disk = len(commits)
+        self._loaded_stamp = self._disk_stamp()
+
+    def add_commit(self, file_name, version, user, digest=None, flush=True):
+        """Add a new commit entry; with flush=False the caller batches the save"""
         commit_entry = {
             "file": file_name,
             "version": version,
             "user": user,
             "timestamp": time.time(),
         }
+        if digest is not None:
+            commit_entry["digest"] = digest
         self.metadata["files"][file_name] = version
         self.metadata["commits"].append(commit_entry)
-        self.save_metadata()
+        self._index_commit(commit_entry)
+        if flush:
+            self.save_metadata()
 
     def get_commit_log(self, filename=None):
         """Get the commit history for a specific file or all files"""
         if filename:
-            return [c for c in self.metadata["commits"] if c["file"] == filename]
+            return self._by_file.get(filename, [])
         return self.metadata["commits"]
 
     def get_last_commit(self, filename):
         """Retrieve the last commit entry for a file"""
-        commits = self.get_commit_log(filename)
+        commits = self._by_file.get(filename)
         return commits[-1] if commits else None
 
+    def find_commit_by_digest(self, file_name, digest):
+        """Find an earlier commit of a file whose content digest matches"""
+        return self._by_digest.get((file_name, digest))
+
     def validate_version(self, file_name, version):
         """Validates that the version is unique and consecutive"""
         if file_name in self.metadata["files"] and self.metadata["files"][file_name] == version:
@@ -414,8 +1225,8 @@ class CommitLog:
 
         last_commit = self.get_last_commit(file_name)
         if last_commit:
-            last_version = VersionNumber.parse(last_commit["version"])
-            new_version = VersionNumber.parse(version)
+            last_version = _parse_version(last_commit["version"])
+            new_version = _parse_version(version)
             if not new_version.is_consecutive(last_version):
                 raise ValueError(f"Error: Version '{version}' is not consecutive with '{last_version}'")
 
@@ -428,19 +1239,30 @@ class CommitLog:
         return self.metadata["files"].get(file_name, None)
 
     def get_next_version(self, file_name):
-        """Get the latest committed version of a file"""
+        """Get the next version number for a file, starting at 1.0 for new files"""
         current_version = self.get_version(file_name)
+        if current_version is None:
+            return VersionNumber(1, 0)
         major, minor = map(int, current_version.split('.'))
         return VersionNumber(major, minor).auto_increment()
 
 
-class VCSInterface(cmd.Cmd):
-    def __init__(self, repo):
-        super().__init__()
-        self.repo = repo
-        self.prompt = f"(vcs) {repo.user}@{repo.repo_dir}> "
-        self.intro = "Welcome to your version control system!"
-        self.intro = """
+def _make_parser(prog, *arguments):
+    """Build a small argument parser for one CLI command"""
+    parser = argparse.ArgumentParser(prog=prog, add_help=False)
+    for argument in arguments:
+        if argument.startswith("--"):
+            parser.add_argument(argument, action="store_true")
+        else:
+            parser.add_argument(argument)
+    return parser
+
+
+_ANSI_RE = re.compile(r"\x1b\[[0-9;]*m")
+
+# Built once at import; the escape codes are stripped up front when the
+# output is not a colour terminal
+_INTRO = """
 \033[4m\033[1mVCS commands\033[0m
     \033[1minit\033[0m create an empty zipfile repository
 
@@ -456,7 +1278,7 @@ class VCSInterface(cmd.Cmd):
     \033[1mmerge_branch <source_branch>\033[0m merges changes from the source branch into the current branch.
 
 \033[1m \033[4mTagging commands\033[0m
-    \033[1mcreate_tag <tag_name> <version>\033[0m creates a tag that points to a specific version
+    \033[1mcreate_tag <tag_name> <file_name> <version>\033[0m creates a tag that points to a specific version
     \033[1mlist_tags\033[0m lists all tags associated with specific commits
 
 \033[1m \033[4mRemote repository commands\033[0m
@@ -465,27 +1287,73 @@ class VCSInterface(cmd.Cmd):
 
 \033[1m \033[4mCoding metric commands\033[0m
     \033[1mdiff <file_name> <version1> <version2>\033[0m list the differences in the committed file at version <version1> and <version2>
-    \033[1mmetrics <file_name> <version1> <version2>033[0m display metrics for the committed file
+    \033[1mmetrics <file_name> <version1> <version2>\033[0m display metrics for the committed file
 
     \033[1mexit or quit\033[0m
 
 """
+if "NO_COLOR" in os.environ or not sys.stdout.isatty():
+    _INTRO = _ANSI_RE.sub("", _INTRO)
+
+
+class VCSInterface(cmd.Cmd):
+    # Parsers are built once at class definition time, so each command
+    # invocation pays only for parsing, never for parser construction
+    _COMMIT_PARSER = _make_parser("commit", "file_path", "--auto")
+    _CHECKOUT_PARSER = _make_parser("checkout", "file_name", "version")
+    _DIFF_PARSER = _make_parser("diff", "file_name", "version1", "version2")
+    _METRICS_PARSER = _make_parser("metrics", "file_name", "version1", "version2")
+    _CREATE_BRANCH_PARSER = _make_parser("create_branch", "branch_name")
+    _SWITCH_BRANCH_PARSER = _make_parser("switch_branch", "branch_name")
+    _MERGE_BRANCH_PARSER = _make_parser("merge_branch", "source_branch")
+    _CREATE_TAG_PARSER = _make_parser("create_tag", "tag_name", "file_name", "version")
+
+    def __init__(self, repo):
+        super().__init__()
+        self.repo = repo
+        if readline is not None:
+            # Keep '/' out of the word delimiters so names like feature/x complete
+            delims = readline.get_completer_delims().replace("/", "")
+            readline.set_completer_delims(delims)
+        self.prompt = f"(vcs) {repo.user}@{repo.repo_dir}> "
+        self.intro = _INTRO
+
+    def _parse_args(self, parser, args):
+        """Parse a command line with a prebuilt parser, returning None on bad input"""
+        try:
+            return parser.parse_args(shlex.split(args))
+        except (SystemExit, ValueError):
+            print(parser.format_usage().rstrip())
+            return None
+
+    def do_init(self, _):
+        """Initialise the repository storage. Usage: init"""
+        self.repo.init_repo()
+        print(f"Initialised repository at '{self.repo.repo_dir}'")
+
     # --- commit and log commands ---
     def do_commit(self, args):
-        """Commit a file. Usage: commit <filename>"""
-        filename = args.strip()
-        if not filename:
-            print("Usage: commit <filename>")
+        """Commit a file. Usage: commit <filename> [--auto]"""
+        parsed = self._parse_args(self._COMMIT_PARSER, args)
+        if parsed:
+            self.repo.commit_file(parsed.file_path, auto=parsed.auto)
+
+    def do_commit_many(self, args):
+        """Commit several files in one batch. Usage: commit_many <file> [<file> ...]"""
+        try:
+            paths = shlex.split(args)
+        except ValueError:
+            paths = []
+        if not paths:
+            print("Usage: commit_many <file> [<file> ...]")
             return
-        self.repo.commit_file(filename)
+        self.repo.commit_many(paths)
 
     def do_checkout(self, args):
         """Checkout a specific version. Usage: checkout <file_name> <version>"""
-        try:
-            file_name, version = args.split()
-            self.repo.rollback_file(file_name, version)
-        except ValueError:
-            print("Invalid arguments! Use: checkout <file_name> <version>")
+        parsed = self._parse_args(self._CHECKOUT_PARSER, args)
+        if parsed:
+            self.repo.rollback_file(parsed.file_name, parsed.version)
 
     def do_log(self, _):
         """Show the commit log"""
@@ -493,80 +1361,77 @@ class VCSInterface(cmd.Cmd):
 
     def do_diff(self, args):
         """Show diff between two versions. Usage: diff <file_name> <version1> <version2>"""
-        try:
-            file_name, version1, version2 = args.split()
-            version1_obj = FileVersion(file_name, version1, self.repo.repo_dir)
-            version2_obj = FileVersion(file_name, version2, self.repo.repo_dir)
+        parsed = self._parse_args(self._DIFF_PARSER, args)
+        if parsed:
+            version1_obj = FileVersion(parsed.file_name, parsed.version1, self.repo.repo_dir)
+            version2_obj = FileVersion(parsed.file_name, parsed.version2, self.repo.repo_dir)
             version1_obj.show_diff(version2_obj)
-        except ValueError:
-            print("Invalid arguments! Use: diff <file_name> <version1> <version2>")
 
     def do_metrics(self, args):
         """Usage: metrics <file_name> <version1> <version2>"""
-        try:
-            file_name, version1, version2 = args.split()
-            version1_obj = FileVersion(file_name, version1, self.repo.repo_dir)
-            version2_obj = FileVersion(file_name, version2, self.repo.repo_dir)
+        parsed = self._parse_args(self._METRICS_PARSER, args)
+        if parsed:
+            version1_obj = FileVersion(parsed.file_name, parsed.version1, self.repo.repo_dir)
+            version2_obj = FileVersion(parsed.file_name, parsed.version2, self.repo.repo_dir)
             version1_obj.calculate_metrics(version2_obj)
-        except ValueError:
-            print("Invalid arguments! Use: metrics <file_name> <version1> <version2>")
 
     # --- branch commands ---
-    def do_create_branch(self, branch_name):
+    def do_create_branch(self, args):
         """Create a new branch. Usage: create_branch <branch_name>"""
-        self.repo.create_branch(branch_name)
+        parsed = self._parse_args(self._CREATE_BRANCH_PARSER, args)
+        if parsed:
+            self.repo.create_branch(parsed.branch_name)
 
     def do_list_branches(self, _):
         """Lists all available branches. Usage: list_branches"""
-        branches = self.repo.list_branches()
-        print("Available branches:")
-        for branch in branches:
-            print(f"  - {branch}")
+        self.repo.list_branches()
 
     def do_switch_branch(self, args):
         """Switch to a branch. Usage: switch_branch <branch_name>"""
-        try:
-            source_branch = args.split()
-            self.repo.switch_branch(source_branch)
-        except:
-            print("Invalid arguments! Useage: switch_branch <source_branch>")
+        parsed = self._parse_args(self._SWITCH_BRANCH_PARSER, args)
+        if parsed:
+            self.repo.switch_branch(parsed.branch_name)
 
     def complete_switch_branch(self, text, line, begidx, endidx):
         """Auto-complete branch names for the switch_branch command"""
-        with open(self.repo.metadata_file, "r") as f:
-            metadata = json.load(f)
-        branches = metadata["branches"].keys()
-        return [branch for branch in branches if branch.startswith(text)]
-    
+        return sorted(branch for branch in self.repo._branch_index()
+                      if branch.startswith(text))
+
+    complete_merge_branch = complete_switch_branch
+
     def do_merge_branch(self, args):
         """Merge a branch into the current branch. Usage: merge_branch <source_branch>"""
-        try:
-            source_branch = args.split()
-            self.repo.merge_branch(source_branch)
-        except:
-            print("Invalid arguments! Useage: merge_branch <source_branch>")
+        parsed = self._parse_args(self._MERGE_BRANCH_PARSER, args)
+        if parsed:
+            self.repo.merge_branch(parsed.source_branch)
 
     # --- tagging commands ---
     def do_create_tag(self, args):
-        """Add a tag to a version. Usage: create_tag <tag_name> <filename> <version>"""
-        try:
-            tag_name, file_name, version = args.split()
-            self.repo.create_tag(tag_name, version)
-        except ValueError:
-            print("Invalid arguments! Use: create_tag <tag_name> <version>")
+        """Add a tag to a version. Usage: create_tag <tag_name> <file_name> <version>"""
+        parsed = self._parse_args(self._CREATE_TAG_PARSER, args)
+        if parsed:
+            self.repo.create_tag(parsed.tag_name, parsed.file_name, parsed.version)
 
     def do_list_tags(self, _):
         """List all tags in the repository"""
         self.repo.list_tags()
 
     # --- remote repository commands ---
-    def do_push(self, _):
-        """Push changes to a remote repository. Usage: push <remote_directory>"""
-        self.repo.push()
+    def do_set_remote(self, args):
+        """Configure the remote directory. Usage: set_remote <remote_directory>"""
+        remote_dir = args.strip()
+        if not remote_dir:
+            print("Usage: set_remote <remote_directory>")
+            return
+        self.repo.set_remote(remote_dir)
+
+    def do_push(self, args):
+        """Push changes to a remote repository. Usage: push [<remote_directory>]"""
+        self.repo.push(args.strip() or None)
 
-    def do_pull(self, _):
-        """Pull changes from a remote repository. Usage: pull <remote_directory>"""
-        self.repo.pull()
+    def do_pull(self, args):
+        """Pull changes from a remote repository. Usage: pull [<remote_directory>]"""
+        self.repo.pull(args.strip() or None)
 
     # --- miscellaneous commands ---
     def do_set_user(self, user_name):